@@ -1,14 +1,272 @@
 #!/usr/bin/env python3
+import importlib.util
+import mmap
+import multiprocessing
+import os
+import queue
+import re
 import sys
-import json
-from pymongo import MongoClient
+import threading
+from collections import Counter
+from datetime import datetime
+from pymongo import IndexModel, MongoClient, WriteConcern
 
-BATCH_SIZE = 1000
+# Prefer a fast JSON parser when one is installed, falling back to the
+# standard library so the loader still runs with only pymongo available
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+except ImportError:
+    try:
+        import simdjson
+        json_loads = simdjson.loads
+        JSONDecodeError = ValueError
+    except ImportError:
+        import json
+        json_loads = json.loads
+        JSONDecodeError = json.JSONDecodeError
+
+# Wire compression, requested only when the snappy or zstandard library is
+# installed: both scripts connect to localhost, where a slower codec such as
+# zlib would cost more CPU than it saves on the network. phase2_query.py
+# builds its client options the same way
+COMPRESSORS = [name for name, module in (('snappy', 'snappy'), ('zstd', 'zstandard'))
+               if importlib.util.find_spec(module) is not None]
+COMPRESSION_OPTIONS = {'compressors': ','.join(COMPRESSORS)} if COMPRESSORS else {}
+
+# Documents per insert_many call, overridable through the environment; returns
+# None for a value that is not a positive number so main() can report it
+def read_batch_size():
+    try:
+        size = int(os.environ.get('BATCH_SIZE', 5000))
+    except ValueError:
+        return None
+    return size if size >= 1 else None
+
+BATCH_SIZE = read_batch_size()
+# Flush early once a batch nears MongoDB's 16 MB message limit
+BATCH_BYTES = 15_000_000
+# Batches parsed ahead of the inserter; bounded so a slow server applies backpressure
+QUEUE_SIZE = 4
+# Print a progress line once per this many inserted batches
+LOG_EVERY = 50
+# Fields every article must have before it is inserted
+REQUIRED_FIELDS = frozenset(('id', 'content', 'title', 'media-type', 'source', 'published'))
+# Word tokens counted by the most-common-words query, matched on lowercased content
+WORD_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+
+# Index the fields the query menu filters on so those queries avoid collection scans.
+# Called only once the load has finished: building each index in one pass over
+# the collection is far cheaper than maintaining it through every insert
+def create_article_indexes(collection):
+    collection.create_indexes([
+        IndexModel([('media-type', 1), ('published', 1)]),
+        IndexModel([('source_key', 1), ('published', -1)]),
+        IndexModel([('published', 1)])
+    ])
+    print("Created indexes on 'articles'")
+
+# Store the per-media-type word totals counted during the load in 'word_counts',
+# so the most-common-words query reads a small indexed collection instead of
+# tokenizing every article on each request
+def build_word_counts(db, word_counts):
+    # Recreate the collection explicitly with snappy block compression so the
+    # totals stay small on disk and cheap to read
+    db['word_counts'].drop()
+    db.create_collection(
+        'word_counts',
+        storageEngine={'wiredTiger': {'configString': 'block_compressor=snappy'}}
+    )
+    totals = [
+        {'media_type': media_type, 'word': word, 'count': count}
+        for media_type, counts in word_counts.items()
+        for word, count in counts.items()
+    ]
+    if totals:
+        db['word_counts'].insert_many(totals, ordered=False)
+    # Serves find({'media_type': ...}).sort(count desc, word asc) directly from the index
+    db['word_counts'].create_index([('media_type', 1), ('count', -1), ('word', 1)])
+    print("Built 'word_counts' collection")
+
+# Add one range's word totals into the running totals for the whole file
+def merge_word_counts(totals, word_counts):
+    for media_type, counts in word_counts.items():
+        totals.setdefault(media_type, Counter()).update(counts)
+
+# Background thread body: insert batches from the queue until the None sentinel
+# arrives, so parsing the next batch overlaps with the previous network round trip
+def run_inserter(collection, batches, stats):
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        # After a failure keep draining the queue so the parser never blocks on put()
+        if stats['error'] is not None:
+            continue
+        batch, final = item
+        try:
+            # Unordered, so the server can apply the writes in parallel
+            collection.insert_many(batch, ordered=False)
+            stats['documents'] += len(batch)
+            stats['batches'] += 1
+            # Report progress every LOG_EVERY batches rather than on each one
+            if final:
+                print(f"Inserted final batch {stats['batches']} ({stats['documents']} documents so far)")
+            elif stats['batches'] % LOG_EVERY == 0:
+                print(f"Inserted batch {stats['batches']} ({stats['documents']} documents so far)")
+        except Exception as e:
+            stats['error'] = e
+
+# Open a client on the local server, compressing bulk inserts when possible;
+# retryable writes are skipped since a failed load is simply re-run. The pool
+# holds a single connection: a process only ever has one insert in flight, and
+# sending every unacknowledged batch down the same socket is what lets a later
+# acknowledged command confirm they have all been applied
+def connect(port):
+    return MongoClient('localhost', port, maxPoolSize=1, retryWrites=False,
+                       **COMPRESSION_OPTIONS)
+
+# The articles collection with unacknowledged writes, so the driver sends each
+# batch without waiting for the server's reply; a failed load is simply re-run
+def get_articles(client):
+    return client['291db'].get_collection('articles', write_concern=WriteConcern(w=0))
+
+# Yield every line that starts within bytes [start, end) of the file (end of
+# None means read to EOF). The file is memory-mapped so lines are split by
+# mmap.readline() straight from the page cache rather than a read buffer
+def read_lines(file_handle, start, end):
+    # An empty file cannot be mapped and holds no lines anyway
+    if os.fstat(file_handle.fileno()).st_size == 0:
+        return
+    with mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # Skip the partial line that begins before 'start'; the previous range owns it
+        if start > 0:
+            mapped.seek(start - 1)
+            mapped.readline()
+        position = mapped.tell()
+        for line in iter(mapped.readline, b''):
+            # Stop at the first line owned by the next range
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            yield line
+
+# Parse and insert every line that starts within bytes [start, end) of the file;
+# returns the number of documents sent and their word counts per media type
+def load_range(collection, file_handle, start, end):
+    # Warnings in a worker's range count lines from the start of that range
+    where = "" if start == 0 else f" after byte offset {start}"
+
+    # Prepare variables to hold the current batch, plus the counts the inserter thread updates
+    batch = []
+    batch_bytes = 0
+    stats = {'documents': 0, 'batches': 0, 'error': None}
+    word_counts = {}
+
+    # Start the inserter; daemon so an error exit here doesn't wait on it
+    batches = queue.Queue(maxsize=QUEUE_SIZE)
+    inserter = threading.Thread(target=run_inserter, args=(collection, batches, stats), daemon=True)
+    inserter.start()
+
+    # Read the file line-by-line
+    for line_num, line in enumerate(read_lines(file_handle, start, end), 1):
+        # Check the common bare-newline case before paying for strip()
+        if line == b'\n' or not line.strip():
+            # Skip empty lines; the parser accepts the trailing newline
+            continue
+
+        try:
+            # Parse the JSON object on this line into a Python dict
+            document = json_loads(line)
+
+            # Basic validation to ensure required fields exist
+            if not REQUIRED_FIELDS.issubset(document):
+                # If a document is missing required fields, warn and skip it
+                print(f"Warning: Line {line_num}{where} missing required fields, skipping", file=sys.stderr)
+                continue
+
+            # Normalize once here so queries can match 'published' as a date
+            # and 'media-type' by equality without per-query conversions. A value
+            # that can't be converted is stored as-is rather than dropping the article
+            published = document['published']
+            try:
+                if not isinstance(published, str):
+                    raise ValueError(published)
+                document['published'] = datetime.fromisoformat(published.replace('Z', '+00:00'))
+            except ValueError:
+                print(f"Warning: Line {line_num}{where} has an invalid published value {published!r}, storing it unconverted", file=sys.stderr)
+            # A lowercased copy of the source lets the recent-articles query match
+            # case-insensitively with an indexed equality; 'source' keeps its display form
+            if isinstance(document['source'], str):
+                document['source_key'] = document['source'].lower()
+            if isinstance(document['media-type'], str):
+                document['media-type'] = document['media-type'].lower()
+            else:
+                print(f"Warning: Line {line_num}{where} has an invalid media-type value {document['media-type']!r}, storing it unconverted", file=sys.stderr)
+            # Count the content's words here, once, so the word counts never run a
+            # regex on the server and the tokens are never stored on the article;
+            # articles without a string media type or content have no words to count
+            if isinstance(document['media-type'], str) and isinstance(document['content'], str):
+                word_counts.setdefault(document['media-type'], Counter()).update(
+                    WORD_PATTERN.findall(document['content'].lower())
+                )
+
+            # Add the document to the batch, using the raw line length as
+            # a cheap estimate of its encoded size
+            batch.append(document)
+            batch_bytes += len(line)
+
+            # If we've reached the batch size or byte budget, hand them to the inserter
+            if len(batch) >= BATCH_SIZE or batch_bytes >= BATCH_BYTES:
+                # Stop reading once an insert has failed; the error is raised below
+                if stats['error'] is not None:
+                    break
+                batches.put((batch, False))
+                # Reset the batch list to collect the next group
+                batch = []
+                batch_bytes = 0
+
+        except JSONDecodeError as e:
+            # JSON parsing errors - e.g. bad inputs — warn and continue
+            print(f"Warning: Invalid JSON on line {line_num}{where}: {e}", file=sys.stderr)
+            continue
+        except Exception as e:
+            # Catch for other unexpected per-line errors
+            print(f"Warning: Error processing line {line_num}{where}: {e}", file=sys.stderr)
+            continue
+
+    # After the loop, if any documents remain in the batch, insert them
+    if batch and stats['error'] is None:
+        batches.put((batch, True))
+
+    # Wait for the inserter to finish the batches still in flight
+    batches.put(None)
+    inserter.join()
+    if stats['error'] is not None:
+        raise stats['error']
+
+    # The batches were sent unacknowledged on the client's only pooled connection,
+    # and the server handles one socket's messages in order, so this acknowledged
+    # round trip on that same socket returns once they have all been applied
+    collection.database.command('ping')
+    return stats['documents'], word_counts
+
+# Worker process body for --workers: load one byte range with its own client,
+# since MongoClient connections must not be shared across processes;
+# returns the number of documents sent and their word counts
+def load_worker(json_filename, port, start, end):
+    client = connect(port)
+    try:
+        with open(json_filename, 'rb') as file_handle:
+            return load_range(get_articles(client), file_handle, start, end)
+    finally:
+        client.close()
 
 def main():
-    # Check command-line arguments - expect exactly two: filename and port
-    if len(sys.argv) != 3:
-        print("Usage: python3 load-json.py <json-file> <port>", file=sys.stderr)
+    # Check command-line arguments - expect a filename and port, optionally followed by --workers N
+    if len(sys.argv) not in (3, 5) or (len(sys.argv) == 5 and sys.argv[3] != '--workers'):
+        print("Usage: python3 load-json.py <json-file> <port> [--workers N]", file=sys.stderr)
         sys.exit(1)
 
     # Extract the filename and port string
@@ -22,9 +280,26 @@ def main():
         print(f"Error: Port must be a number, got '{sys.argv[2]}'", file=sys.stderr)
         sys.exit(1)
 
-    # Try to open the input file for reading with UTF-8 encoding
+    # Reject a bad BATCH_SIZE before any work starts
+    if BATCH_SIZE is None:
+        print(f"Error: BATCH_SIZE must be a positive number, got '{os.environ.get('BATCH_SIZE')}'", file=sys.stderr)
+        sys.exit(1)
+
+    # Number of parallel loader processes, one by default
+    workers = 1
+    if len(sys.argv) == 5:
+        try:
+            workers = int(sys.argv[4])
+        except ValueError:
+            workers = 0
+        if workers < 1:
+            print(f"Error: Workers must be a positive number, got '{sys.argv[4]}'", file=sys.stderr)
+            sys.exit(1)
+
+    # Try to open the input file for reading in binary mode; it is memory-mapped
+    # and the JSON parser decodes the UTF-8 bytes itself, so no per-line str conversion
     try:
-        file_handle = open(json_filename, 'r', encoding='utf-8')
+        file_handle = open(json_filename, 'rb')
     except FileNotFoundError:
         # If File Not Found, print an error and exit
         print(f"Error: File '{json_filename}' not found", file=sys.stderr)
@@ -36,7 +311,7 @@ def main():
 
     # Connect to a local MongoDB server on the given port and verify the connection
     try:
-        client = MongoClient('localhost', port)
+        client = connect(port)
         # A lightweight command to check the server is reachable
         client.admin.command('ping')
     except Exception as e:
@@ -47,67 +322,45 @@ def main():
     # Use (or create) a database named '291db'
     db = client['291db']
 
-    # If an 'articles' collection already exists, remove that collection and start fresh
-    if 'articles' in db.list_collection_names():
+    # If an 'articles' collection already exists, remove that collection and start fresh;
+    # dropping it also discards its indexes, which are rebuilt after the load
+    # (listCollections is filtered server-side so only this one name comes back)
+    if db.list_collection_names(filter={'name': 'articles'}):
         db['articles'].drop()
         print("Dropped existing 'articles' collection")
 
-    collection = db['articles']
-
-    # Prepare variables to hold the current batch, total documents inserted, and batch count
-    batch = []
-    total_documents = 0
-    batch_count = 0
+    collection = get_articles(client)
 
     try:
-        # Read the file line-by-line
-        for line_num, line in enumerate(file_handle, 1):
-            # Remove leading/trailing whitespace including the newline
-            line = line.strip()
-            if not line:
-                # Skip empty lines
-                continue
+        if workers == 1:
+            sent_documents, word_counts = load_range(collection, file_handle, 0, None)
+        else:
+            # Split the file into equal byte ranges; each worker realigns its
+            # range to line boundaries and inserts into the same collection
+            file_size = os.fstat(file_handle.fileno()).st_size
+            step = max(-(-file_size // workers), 1)
+            ranges = [
+                (json_filename, port, offset, min(offset + step, file_size))
+                for offset in range(0, file_size, step)
+            ]
+            with multiprocessing.get_context('spawn').Pool(workers) as pool:
+                results = pool.starmap(load_worker, ranges)
+            sent_documents = sum(sent for sent, _ in results)
+            word_counts = {}
+            for _, range_counts in results:
+                merge_word_counts(word_counts, range_counts)
 
-            try:
-                # Parse the JSON object on this line into a Python dict
-                document = json.loads(line)
-
-                # Basic validation to ensure required fields exist
-                required_fields = ['id', 'content', 'title', 'media-type', 'source', 'published']
-                if not all(field in document for field in required_fields):
-                    # If a document is missing required fields, warn and skip it
-                    print(f"Warning: Line {line_num} missing required fields, skipping", file=sys.stderr)
-                    continue
-
-                # Add the document to the batch
-                batch.append(document)
-
-                # If we've reached the batch size, write them to MongoDB
-                if len(batch) >= BATCH_SIZE:
-                    collection.insert_many(batch)
-                    total_documents += len(batch)
-                    batch_count += 1
-                    print(f"Inserted batch {batch_count} ({len(batch)} documents)")
-                    # Reset the batch list to collect the next group
-                    batch = []
-
-            except json.JSONDecodeError as e:
-                # JSON parsing errors - e.g. bad inputs — warn and continue
-                print(f"Warning: Invalid JSON on line {line_num}: {e}", file=sys.stderr)
-                continue
-            except Exception as e:
-                # Catch for other unexpected per-line errors
-                print(f"Warning: Error processing line {line_num}: {e}", file=sys.stderr)
-                continue
+        # Unacknowledged writes report no errors, so count what the server actually stored
+        total_documents = collection.estimated_document_count()
+        if total_documents < sent_documents:
+            print(f"Warning: {sent_documents - total_documents} documents were rejected by the server", file=sys.stderr)
+        print(f"\nCompleted! Total documents inserted: {total_documents}")
 
-        # After the loop, if any documents remain in the batch, insert them
-        if batch:
-            collection.insert_many(batch)
-            total_documents += len(batch)
-            batch_count += 1
-            print(f"Inserted final batch {batch_count} ({len(batch)} documents)")
+        # Only now that every batch is in, index the fields the query menu filters on
+        create_article_indexes(collection)
 
-        print(f"\nCompleted! Total documents inserted: {total_documents}")
+        # Store the word frequencies counted during the load for the query menu
+        build_word_counts(db, word_counts)
 
     except Exception as e:
         # If something goes wrong during the processing loop, report and exit
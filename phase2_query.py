@@ -1,8 +1,19 @@
 #!/usr/bin/env python3
+import importlib.util
 import sys
-from datetime import datetime
+from functools import lru_cache
+from datetime import datetime, timedelta
 from pymongo import MongoClient
 
+# Wire compression options, built the same way as in load-json.py
+COMPRESSORS = [name for name, module in (('snappy', 'snappy'), ('zstd', 'zstandard'))
+               if importlib.util.find_spec(module) is not None]
+COMPRESSION_OPTIONS = {'compressors': ','.join(COMPRESSORS)} if COMPRESSORS else {}
+
+# Documents per cursor batch for aggregate results, so large result sets
+# (e.g. every article from a busy source) arrive in a few round trips
+CURSOR_BATCH_SIZE = 10000
+
 
 def print_menu():
     # Show the user Menu to pick a query to run
@@ -14,6 +25,35 @@ def print_menu():
     print("4. 5 Most Recent Articles by Source")
     print("5. Exit")
 
+# Query option 1 results from the precomputed word totals; cached for the session
+# since the data does not change while the menu is running
+@lru_cache(maxsize=64)
+def query_common_words(collection, media_type):
+    # Word totals are precomputed by load-json.py into 'word_counts', indexed on
+    # (media_type, count desc, word asc), so this is a bounded index read
+    word_counts = collection.database['word_counts']
+    top_5 = list(
+        word_counts.find({'media_type': media_type}, {'_id': 0, 'word': 1, 'count': 1})
+        .sort([('count', -1), ('word', 1)])
+        .limit(5)
+    )
+    
+    # Take the top 5, then include any words that tie with the 5th place
+    if len(top_5) >= 5:
+        fifth_count = top_5[4]['count']
+        # Track words already included in top 4 (to avoid duplicates)
+        included_words = [item['word'] for item in top_5[:4]]
+        # Find all words with the same count as the 5th item, excluding those already in top 4
+        tied_words = list(
+            word_counts.find(
+                {'media_type': media_type, 'count': fifth_count, 'word': {'$nin': included_words}},
+                {'_id': 0, 'word': 1, 'count': 1}
+            ).sort('word', 1)
+        )
+        # Combine top 4 with all tied at 5th position (deduplicated)
+        return tuple(top_5[:4] + tied_words)
+    return tuple(top_5)
+
 # Handle option 1: Most common words by media type
 def handle_common_words(collection):
     media_type = input("Enter media type (news/blog): ").strip().lower()
@@ -22,140 +62,58 @@ def handle_common_words(collection):
         print("Entered media type was invalid. Please enter 'news' or 'blog' only.")
         return
     
-    # Use aggregation pipeline to do all processing in MongoDB.
-    # This pipeline does: filter, then lowercase, then tokenize, then count, then sort
-    pipeline = [
-        # 1) Filter by media type, case-insensitive
-        {
-            '$match': {
-                '$expr': {
-                    '$eq': [
-                        {'$toLower': '$media-type'},
-                        media_type
-                    ]
-                }
-            }
-        },
-        # 2) Build a lowercase text field from content only
-        {
-            '$project': {
-                'text': {
-                    '$toLower': {
-                        '$ifNull': ['$content', '']
-                    }
-                }
-            }
-        },
-        # 3) Extract word tokens using regexFindAll
-        {
-            '$project': {
-                'words': {
-                    '$map': {
-                        'input': {
-                            '$regexFindAll': {
-                                'input': '$text',
-                                'regex': '[a-zA-Z0-9_-]+'
-                            }
-                        },
-                        'as': 'm',
-                        'in': '$$m.match'
-                    }
-                }
-            }
-        },
-        # 4) Unwind the words array; create one document per word
-        {'$unwind': '$words'},
-        # 5) Group by word and count
-        {
-            '$group': {
-                '_id': '$words',
-                'count': {'$sum': 1}
-            }
-        },
-        # 6) Sort by count descending, then word ascending for result order
-        {'$sort': {'count': -1, '_id': 1}}
-    ]
+    result = query_common_words(collection, media_type)
     
-    # Get all results
-    all_results = list(collection.aggregate(pipeline))
-    
-    if not all_results:
+    if not result:
         print(f"No articles found for media type '{media_type}' or no content available in the database.")
         return
     
-    # Get top 5, then include any words that tie with the 5th place
-    top_5 = all_results[:5]
-    
-    if len(top_5) >= 5:
-        fifth_count = top_5[4]['count']
-        # Track words already included in top 4 (to avoid duplicates)
-        included_words = {item['_id'] for item in top_5[:4]}
-        # Find all words with the same count as the 5th item, excluding those already in top 4
-        tied_words = [
-            item for item in all_results 
-            if item['count'] == fifth_count and item['_id'] not in included_words
-        ]
-        # Combine top 4 with all tied at 5th position (deduplicated)
-        result = top_5[:4] + tied_words
-    else:
-        result = top_5
-    
     # Print results
     print(f"\nTop 5 most common words for '{media_type}'are:")
     for i, item in enumerate(result, 1):
-        word = item['_id']
+        word = item['word']
         count = item['count']
         print(f"{i}. {word}: {count}")
 
-# Handle option 2: Article count difference between news and blogs
-def handle_article_count(collection):
-    date_str = input("Enter date (YYYY-MM-DD, e.g., 2015-09-01): ").strip()
-    
-    # Validate date
-    try:
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-    except ValueError:
-        print("Date format was invalid. Please use YYYY-MM-DD format.")
-        return
+# Query option 2 counts per media type for one day; cached on the day's datetime
+@lru_cache(maxsize=64)
+def query_article_counts(collection, day_start):
+    # Bounds of the requested day; load-json.py stores 'published' as a date
+    day_end = day_start + timedelta(days=1)
     
     # Use aggregation pipeline to count articles by media type for the given date
-    # We normalize the 'published' field to a date and build a date string like 'YYYY-MM-DD' so we can match exactly on the day
+    # 'media-type' is stored lowercase, so both filters are plain index-eligible matches
     pipeline = [
-        # 1) Compute date-only string and lowercase media type
-        {
-            '$project': {
-                'mediaTypeLower': {'$toLower': '$media-type'},
-                'dateOnly': {
-                    '$dateToString': {
-                        'format': '%Y-%m-%d',
-                        'date': {
-                            '$cond': {
-                                'if': {'$eq': [{'$type': '$published'}, 'date']},
-                                'then': '$published',
-                                'else': {'$toDate': '$published'}
-                            }
-                        }
-                    }
-                }
-            }
-        },
-        # 2) Match only docs for that date and where media type is news/blog
+        # 1) Match docs published on that day where media type is news/blog
         {
             '$match': {
-                'dateOnly': date_str,
-                'mediaTypeLower': {'$in': ['news', 'blog']}
+                'published': {'$gte': day_start, '$lt': day_end},
+                'media-type': {'$in': ['news', 'blog']}
             }
         },
-        # 3) Group by media type and count
+        # 2) Group by media type and count
         {
             '$group': {
-                '_id': '$mediaTypeLower',
+                '_id': '$media-type',
                 'count': {'$sum': 1}
             }
         }
     ]
     
-    results = list(collection.aggregate(pipeline))
+    return tuple(collection.aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE))
+
+# Handle option 2: Article count difference between news and blogs
+def handle_article_count(collection):
+    date_str = input("Enter date (YYYY-MM-DD, e.g., 2015-09-01): ").strip()
+    
+    # Validate date
+    try:
+        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    except ValueError:
+        print("Date format was invalid. Please use YYYY-MM-DD format.")
+        return
+    
+    results = query_article_counts(collection, date_obj)
     
     if not results:
         print("No articles were published on this day.")
@@ -188,27 +146,15 @@ def handle_article_count(collection):
     else:
         print("Both media types had the same number of articles.")
 
-# Handle option 3: Top sources for 2015
-def handle_top_sources_2015(collection):
-    # Use aggregation pipeline with $year to filter 2015 and then count by source
+# Query option 3 results; takes no user input so only the first call hits the server
+@lru_cache(maxsize=64)
+def query_top_sources_2015(collection):
+    # Use aggregation pipeline with a date range to filter 2015 and then count by source
     pipeline = [
-        # 1) Filter to year 2015 using $year
+        # 1) Filter to year 2015 with a range on 'published' that the index can satisfy
         {
             '$match': {
-                '$expr': {
-                    '$eq': [
-                        {
-                            '$year': {
-                                '$cond': {
-                                    'if': {'$eq': [{'$type': '$published'}, 'date']},
-                                    'then': '$published',
-                                    'else': {'$toDate': '$published'}
-                                }
-                            }
-                        },
-                        2015
-                    ]
-                }
+                'published': {'$gte': datetime(2015, 1, 1), '$lt': datetime(2016, 1, 1)}
             }
         },
         # 2) Group by source and count
@@ -218,34 +164,31 @@ def handle_top_sources_2015(collection):
                 'count': {'$sum': 1}
             }
         },
-        # 3) Sort by count descending, then source ascending for deterministic ordering
+        # 3) Rank sources by count; tied counts share a rank and the next rank
+        # skips ahead, so rank <= 5 is the top 5 plus every tie at 5th position
+        {
+            '$setWindowFields': {
+                'sortBy': {'count': -1},
+                'output': {'rank': {'$rank': {}}}
+            }
+        },
+        # 4) Keep only the ranked top 5 (with ties) so just those are sent back
+        {'$match': {'rank': {'$lte': 5}}},
+        # 5) Sort by count descending, then source ascending for deterministic ordering
         {'$sort': {'count': -1, '_id': 1}}
     ]
     
-    # Get all results
-    all_results = list(collection.aggregate(pipeline))
+    # Get the top 5 sources, including any ties at 5th position
+    return tuple(collection.aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE))
+
+# Handle option 3: Top sources for 2015
+def handle_top_sources_2015(collection):
+    result = query_top_sources_2015(collection)
     
-    if not all_results:
+    if not result:
         print("No articles found for year 2015.")
         return
     
-    # Get top 5 sources by count, but also include any ties at 5th position
-    top_5 = all_results[:5]
-    
-    if len(top_5) >= 5:
-        fifth_count = top_5[4]['count']
-        # Track sources already included in top 4 (to avoid duplicates)
-        included_sources = {item['_id'] for item in top_5[:4]}
-        # Find all sources with the same count as the 5th item, excluding those already in top 4
-        tied_sources = [
-            item for item in all_results 
-            if item['count'] == fifth_count and item['_id'] not in included_sources
-        ]
-        # Combine top 4 with all tied at 5th position (deduplicated)
-        result = top_5[:4] + tied_sources
-    else:
-        result = top_5
-    
     # Print results
     print("\nTop 5 news sources by article count (2015) (including ties at 5th position):")
     for i, result_item in enumerate(result, 1):
@@ -253,77 +196,36 @@ def handle_top_sources_2015(collection):
         count = result_item['count']
         print(f"{i}. {source}: {count} articles")
 
-# Handle option 4: 5 Most Recent Articles by Source
-def handle_recent_by_source(collection):
-    source_name = input("Enter source name: ").strip()
-    
-    if not source_name:
-        print("Source name cannot be empty.")
-        return
-    
-    # Work with lowercase input and treat it as a literal inside the pipeline so
-    # that special characters (if any) are not treated as MongoDB operators
-    source_literal = source_name.lower()
-    
+# Query option 4 results for a lowercased source name; cached per source
+@lru_cache(maxsize=64)
+def query_recent_by_source(collection, source_literal):
     # Use aggregation pipeline for case-insensitive source matching and sorting
-    # by the actual published datetime so "most recent" is correctly handled
+    # by the actual published datetime so "most recent" is correctly handled.
+    # load-json.py stores the lowercased source as 'source_key' and indexes it with
+    # published descending, so the match and sort are a single index scan
     pipeline = [
         # 1) Match source
-        {
-            '$match': {
-                '$expr': {
-                    '$eq': [
-                        {'$toLower': '$source'},
-                        {'$literal': source_literal}
-                    ]
-                }
-            }
-        },
-        # 2) Convert published to date for proper sorting by datetime
+        {'$match': {'source_key': source_literal}},
+        # 2) Sort by published date descending (most recent first)
+        {'$sort': {'published': -1}},
+        # 3) Project final format
         {
             '$project': {
+                '_id': 0,
                 'title': 1,
-                'published': 1,
-                'publishedDate': {
-                    '$cond': {
-                        'if': {'$eq': [{'$type': '$published'}, 'date']},
-                        'then': '$published',
-                        'else': {'$toDate': '$published'}
-                    }
-                },
-                'dateOnly': {
+                'publishedDate': '$published',
+                'date': {
                     '$dateToString': {
                         'format': '%Y-%m-%d',
-                        'date': {
-                            '$cond': {
-                                'if': {'$eq': [{'$type': '$published'}, 'date']},
-                                'then': '$published',
-                                'else': {'$toDate': '$published'}
-                            }
-                        }
+                        'date': '$published'
                     }
                 }
             }
-        },
-        # 3) Sort by published date descending (most recent first)
-        {'$sort': {'publishedDate': -1}},
-        # 4) Project final format
-        {
-            '$project': {
-                '_id': 0,
-                'title': 1,
-                'publishedDate': 1,
-                'date': '$dateOnly'
-            }
         }
     ]
     
     # Get all articles for this source
-    all_articles = list(collection.aggregate(pipeline))
-    
-    if not all_articles:
-        print(f"Source '{source_name}' was not found in the database.")
-        return
+    all_articles = list(collection.aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE))
     
     # Get top 5, then include all articles tied at 5th position (same published datetime)
     top_5 = all_articles[:5]
@@ -335,19 +237,38 @@ def handle_recent_by_source(collection):
             # Track articles already included (using title + publishedDate as unique key)
             included_keys = {(article.get('title', ''), article.get('publishedDate')) for article in top_5[:4]}
             
-            # Find all articles with the same publishedDate as the 5th item
+            # The list is sorted newest first, so the articles sharing the 5th
+            # publishedDate form one block starting at index 4; walk only that block
+            tie_end = 5
+            while (tie_end < len(all_articles) and
+                   all_articles[tie_end].get('publishedDate') == fifth_published_date):
+                tie_end += 1
             # Exclude articles already in top 4 to avoid duplicates
             tied_articles = [
-                article for article in all_articles 
-                if (article.get('publishedDate') == fifth_published_date and 
-                    (article.get('title', ''), article.get('publishedDate')) not in included_keys)
+                article for article in all_articles[4:tie_end]
+                if (article.get('title', ''), article.get('publishedDate')) not in included_keys
             ]
             # Combine top 4 with all tied at 5th position (deduplicated)
-            result = top_5[:4] + tied_articles
-        else:
-            result = top_5
-    else:
-        result = top_5
+            return tuple(top_5[:4] + tied_articles)
+    return tuple(top_5)
+
+# Handle option 4: 5 Most Recent Articles by Source
+def handle_recent_by_source(collection):
+    source_name = input("Enter source name: ").strip()
+    
+    if not source_name:
+        print("Source name cannot be empty.")
+        return
+    
+    # Work with lowercase input to match the stored 'source_key'; as a plain string
+    # in an equality match, special characters (if any) are never treated as MongoDB operators
+    source_literal = source_name.lower()
+    
+    result = query_recent_by_source(collection, source_literal)
+    
+    if not result:
+        print(f"Source '{source_name}' was not found in the database.")
+        return
     
     # Print Results
     print(f"\n5 Most Recent Articles from '{source_name}' are:")
@@ -373,7 +294,8 @@ def main():
 
     # Connect to MongoDB server on localhost at the given port
     try:
-        client = MongoClient('localhost', port)
+        # Compress wire traffic when a fast codec is installed
+        client = MongoClient('localhost', port, **COMPRESSION_OPTIONS)
         client.admin.command('ping')
     except Exception as e:
         # If connection fails, print error and exit
@@ -383,7 +305,8 @@ def main():
     db = client['291db']
     collection = db['articles']
     
-    if 'articles' not in db.list_collection_names():
+    # Ask only about 'articles' so the server filters the collection list itself
+    if not db.list_collection_names(filter={'name': 'articles'}):
         # If the data hasn't been loaded yet, tell the user how to fix it
         print("Error: 'articles' collection not found. Please run load-json.py first.", file=sys.stderr)
         client.close()